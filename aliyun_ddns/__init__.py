@@ -9,27 +9,39 @@ __author__ = "Your Name"
 from .core import (
     log_message,
     valid_ip,
+    normalize_ip,
     get_public_ip,
     validate_config,
     load_config,
     get_dns_record,
+    get_zone_records,
     update_dns_record,
     create_dns_record,
     sync_records
 )
 
+# 从 config 模块导入配置模型
+from .config import Account, Domain, Record, Config, ConfigError
+
 # 从 gui 模块导入 GUI 应用
 from .gui import DDNSTrayApp
 
 __all__ = [
     "log_message",
     "valid_ip",
+    "normalize_ip",
     "get_public_ip",
     "validate_config",
     "load_config",
     "get_dns_record",
+    "get_zone_records",
     "update_dns_record",
     "create_dns_record",
     "sync_records",
+    "Account",
+    "Domain",
+    "Record",
+    "Config",
+    "ConfigError",
     "DDNSTrayApp"
 ]
\ No newline at end of file
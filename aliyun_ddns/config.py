@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云 DDNS 配置模型模块
+
+将 YAML 配置编译为不可变的 Account / Domain / Record 对象，
+并支持按配置文件 mtime 缓存编译结果。
+"""
+
+import os
+import pickle
+import logging
+import tempfile
+from types import MappingProxyType
+
+import yaml
+
+from .endpoints import parse_endpoint
+
+logger = logging.getLogger('aliyun_ddns')
+
+# 缓存格式版本，模型结构变化时需要递增
+CACHE_VERSION = 5
+
+# 记录类型与地址族的对应关系
+RECORD_FAMILIES = {'A': 4, 'AAAA': 6}
+
+DEFAULT_REGION = 'cn-hangzhou'
+DEFAULT_INTERVAL = 300
+DEFAULT_MIN_INTERVAL = 15
+DEFAULT_FAST_WINDOW = 300
+DEFAULT_TTL = 600
+DEFAULT_PROBE_INTERVAL = 600
+MAX_TTL = 86400
+
+_TOP_LEVEL_KEYS = {
+    'access_key_id', 'access_key_secret', 'region',
+    'domain', 'records', 'interval', 'ttl',
+    'min_interval', 'max_interval', 'fast_window',
+    'endpoints', 'probe_interval',
+}
+_RECORD_KEYS = {'rr', 'type', 'ttl'}
+
+
+class ConfigError(ValueError):
+    """配置错误"""
+
+
+class _Frozen:
+    """不可变 __slots__ 对象基类"""
+    __slots__ = ()
+    _fields = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 对象不可修改")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 对象不可修改")
+
+    def _set(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self._fields)
+
+    def __hash__(self):
+        return hash((type(self),) + tuple(getattr(self, n) for n in self._fields))
+
+    def __repr__(self):
+        args = ", ".join(f"{n}={getattr(self, n)!r}" for n in self._fields
+                         if n != 'access_key_secret')
+        return f"{type(self).__name__}({args})"
+
+
+class Account(_Frozen):
+    """阿里云账号"""
+    __slots__ = ('access_key_id', 'access_key_secret', 'region',
+                 'endpoints', 'probe_interval')
+    _fields = __slots__
+
+    def __init__(self, access_key_id, access_key_secret, region=DEFAULT_REGION,
+                 endpoints=(), probe_interval=DEFAULT_PROBE_INTERVAL):
+        self._set(access_key_id=access_key_id,
+                  access_key_secret=access_key_secret,
+                  region=region,
+                  endpoints=tuple(endpoints),
+                  probe_interval=probe_interval)
+
+
+class Record(_Frozen):
+    """单条 DNS 记录"""
+    __slots__ = ('rr', 'type', 'ttl', 'domain', 'family', 'name')
+    _fields = ('rr', 'type', 'ttl', 'domain')
+
+    def __init__(self, rr, type, ttl, domain):
+        self._set(rr=rr, type=type, ttl=ttl, domain=domain,
+                  family=RECORD_FAMILIES[type],
+                  name=domain if rr == '@' else f"{rr}.{domain}")
+
+    @property
+    def ipv6(self):
+        return self.family == 6
+
+
+class Domain(_Frozen):
+    """域名及其记录，记录按地址族预先分组"""
+    __slots__ = ('name', 'records', 'by_family')
+    _fields = ('name', 'records')
+
+    def __init__(self, name, records):
+        records = tuple(records)
+        by_family = {}
+        for record in records:
+            by_family.setdefault(record.family, []).append(record)
+        self._set(name=name, records=records,
+                  by_family=MappingProxyType(
+                      {f: tuple(rs) for f, rs in sorted(by_family.items())}))
+
+
+class Config(_Frozen):
+    """编译后的完整配置"""
+    __slots__ = ('account', 'domain', 'interval', 'ttl',
+                 'min_interval', 'max_interval', 'fast_window')
+    _fields = __slots__
+
+    def __init__(self, account, domain, interval=DEFAULT_INTERVAL, ttl=DEFAULT_TTL,
+                 min_interval=None, max_interval=None,
+                 fast_window=DEFAULT_FAST_WINDOW):
+        if max_interval is None:
+            max_interval = interval
+        if min_interval is None:
+            min_interval = min(DEFAULT_MIN_INTERVAL, max_interval)
+        self._set(account=account, domain=domain, interval=interval, ttl=ttl,
+                  min_interval=min_interval,
+                  max_interval=max_interval, fast_window=fast_window)
+
+
+class _LineDict(dict):
+    """记录 YAML 行号的字典"""
+    line = 1
+    key_lines = {}
+    item_lines = {}
+
+    def line_of(self, key):
+        return self.key_lines.get(key, self.line)
+
+    def item_line(self, key, index):
+        """列表类型配置项中第 index 个元素所在行"""
+        lines = self.item_lines.get(key, ())
+        return lines[index] if index < len(lines) else self.line_of(key)
+
+
+class _LineLoader(yaml.SafeLoader):
+    """为映射节点记录行号的 YAML 加载器"""
+
+
+def _construct_mapping(loader, node):
+    mapping = _LineDict(loader.construct_mapping(node, deep=True))
+    mapping.line = node.start_mark.line + 1
+    mapping.key_lines = {k.value: k.start_mark.line + 1 for k, _ in node.value
+                         if isinstance(k, yaml.ScalarNode)}
+    mapping.item_lines = {k.value: [item.start_mark.line + 1 for item in v.value]
+                          for k, v in node.value
+                          if isinstance(k, yaml.ScalarNode) and isinstance(v, yaml.SequenceNode)}
+    return mapping
+
+
+_LineLoader.add_constructor(yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _construct_mapping)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_text(value):
+    return isinstance(value, str) and value.strip() != ''
+
+
+def compile_config(raw, source='<config>'):
+    """校验原始配置并编译为 Config 对象，错误信息带行号"""
+    errors = []
+
+    def error(line, message):
+        errors.append(f"{source}:{line}: {message}")
+
+    if not isinstance(raw, dict):
+        raise ConfigError(f"配置错误: {source}: 顶层必须是映射")
+    if not isinstance(raw, _LineDict):
+        raw = _LineDict(raw)
+
+    for key in raw:
+        if key not in _TOP_LEVEL_KEYS:
+            error(raw.line_of(key), f"未知配置项: {key}")
+
+    for key in ('access_key_id', 'access_key_secret', 'domain'):
+        if key not in raw:
+            error(raw.line, f"缺少配置项: {key}")
+        elif not _is_text(raw[key]):
+            error(raw.line_of(key), f"{key} 必须是非空字符串")
+
+    region = raw.get('region', DEFAULT_REGION)
+    if not _is_text(region):
+        error(raw.line_of('region'), "region 必须是非空字符串")
+
+    endpoints = raw.get('endpoints', [])
+    if not isinstance(endpoints, list) or not all(_is_text(e) for e in endpoints):
+        error(raw.line_of('endpoints'), "endpoints 必须是字符串列表")
+        endpoints = []
+    endpoints = [e.strip() for e in endpoints]
+    for i, spec in enumerate(endpoints):
+        try:
+            parse_endpoint(spec)
+        except ValueError as e:
+            error(raw.item_line('endpoints', i), f"端点{i + 1}无效 ({spec}): {e}")
+    probe_interval = raw.get('probe_interval', DEFAULT_PROBE_INTERVAL)
+    if not _is_int(probe_interval) or probe_interval <= 0:
+        error(raw.line_of('probe_interval'), "probe_interval 必须是正整数")
+
+    interval = raw.get('interval', DEFAULT_INTERVAL)
+    interval_ok = _is_int(interval) and interval > 0
+    if not interval_ok:
+        error(raw.line_of('interval'), "interval 必须是正整数")
+
+    # 自适应轮询：max_interval 默认沿用 interval，min_interval 默认不超过 max_interval
+    max_interval = raw.get('max_interval', interval)
+    max_ok = _is_int(max_interval) and max_interval > 0
+    if 'max_interval' in raw and not max_ok:
+        error(raw.line_of('max_interval'), "max_interval 必须是正整数")
+    if 'min_interval' in raw:
+        min_interval = raw['min_interval']
+        if not _is_int(min_interval) or min_interval <= 0:
+            error(raw.line_of('min_interval'), "min_interval 必须是正整数")
+        elif max_ok and min_interval > max_interval:
+            source_key = 'max_interval' if 'max_interval' in raw else 'interval'
+            error(raw.line_of('min_interval'),
+                  f"min_interval 不能大于 max_interval ({source_key}: {max_interval})")
+    else:
+        min_interval = min(DEFAULT_MIN_INTERVAL, max_interval) if max_ok else DEFAULT_MIN_INTERVAL
+    fast_window = raw.get('fast_window', DEFAULT_FAST_WINDOW)
+    if not _is_int(fast_window) or fast_window < 0:
+        error(raw.line_of('fast_window'), "fast_window 必须是非负整数")
+
+    ttl = raw.get('ttl', DEFAULT_TTL)
+    if not _is_int(ttl) or not 1 <= ttl <= MAX_TTL:
+        error(raw.line_of('ttl'), f"ttl 必须是 1-{MAX_TTL} 之间的整数")
+
+    domain = raw.get('domain')
+    domain = domain.strip().rstrip('.').lower() if _is_text(domain) else ''
+
+    records = []
+    seen = {}
+    raw_records = raw.get('records')
+    if 'records' not in raw:
+        error(raw.line, "缺少配置项: records")
+    elif not isinstance(raw_records, list) or not raw_records:
+        error(raw.line_of('records'), "records 必须是非空列表")
+    else:
+        for i, r in enumerate(raw_records):
+            label = f"记录{i + 1}"
+            if not isinstance(r, dict):
+                error(raw.item_line('records', i), f"{label}必须是映射")
+                continue
+            if not isinstance(r, _LineDict):
+                r = _LineDict(r)
+            for key in r:
+                if key not in _RECORD_KEYS:
+                    error(r.line_of(key), f"{label}包含未知字段: {key}")
+
+            rr = r.get('rr')
+            if _is_int(rr):
+                rr = str(rr)
+            if 'rr' not in r:
+                error(r.line, f"{label}缺少rr字段")
+                rr = None
+            elif not _is_text(rr):
+                error(r.line_of('rr'), f"{label}的rr必须是非空字符串")
+                rr = None
+            else:
+                rr = rr.strip().lower()
+
+            rtype = r.get('type')
+            rtype = rtype.strip().upper() if isinstance(rtype, str) else rtype
+            if rtype not in RECORD_FAMILIES:
+                error(r.line_of('type'), f"{label}类型错误，必须是A或AAAA")
+                rtype = None
+
+            # 未单独设置 ttl 的记录沿用全局 ttl，全局 ttl 的错误已在上面报告
+            rttl = r.get('ttl', ttl)
+            if not _is_int(rttl) or not 1 <= rttl <= MAX_TTL:
+                if 'ttl' in r:
+                    error(r.line_of('ttl'), f"{label}的ttl必须是 1-{MAX_TTL} 之间的整数")
+                rttl = None
+
+            if rr is None or rtype is None or rttl is None or not domain:
+                continue
+            if (rr, rtype) in seen:
+                error(r.line, f"{label}与记录{seen[(rr, rtype)]}重复: {rr} {rtype}")
+                continue
+            seen[(rr, rtype)] = i + 1
+            records.append(Record(rr, rtype, rttl, domain))
+
+    if errors:
+        raise ConfigError("配置错误: " + ", ".join(errors))
+
+    account = Account(raw['access_key_id'].strip(), raw['access_key_secret'].strip(),
+                      region.strip(), endpoints, probe_interval)
+    return Config(account, Domain(domain, records), interval=interval, ttl=ttl,
+                  min_interval=min_interval, max_interval=max_interval,
+                  fast_window=fast_window)
+
+
+def _cache_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.cache")
+
+
+def _cache_key(path):
+    st = os.stat(path)
+    return (CACHE_VERSION, st.st_mtime_ns, st.st_size)
+
+
+def _read_cache(path, key):
+    try:
+        with open(_cache_path(path), 'rb') as f:
+            cached_key, config = pickle.load(f)
+        if cached_key == key and isinstance(config, Config):
+            return config
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.debug(f"读取配置缓存失败: {e}")
+    return None
+
+
+def _write_cache(path, key, config):
+    cache_path = _cache_path(path)
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache_path), prefix='.config-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((key, config), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        logger.debug(f"写入配置缓存失败: {e}")
+
+
+def read_config(path='config.yaml', use_cache=True):
+    """读取并编译配置文件，命中缓存时直接返回缓存的编译结果"""
+    key = _cache_key(path)
+    if use_cache:
+        config = _read_cache(path, key)
+        if config is not None:
+            logger.debug(f"使用配置缓存: {_cache_path(path)}")
+            return config
+
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            raw = yaml.load(f, Loader=_LineLoader)
+        except yaml.YAMLError as e:
+            raise ConfigError(f"配置错误: {path}: YAML 解析失败: {e}") from e
+    config = compile_config(raw if raw is not None else _LineDict(), source=path)
+
+    if use_cache:
+        _write_cache(path, key, config)
+    return config
@@ -4,8 +4,9 @@
 阿里云 DDNS 核心功能模块
 """
 
-import re
 import time
+import threading
+import ipaddress
 import yaml
 import requests
 import logging
@@ -19,48 +20,38 @@ from aliyunsdkalidns.request.v20150109 import (
 )
 
 # 导入工具函数
-from .utils import setup_logging, retry
+from .utils import setup_logging, retry, normalize_ip
+from .config import compile_config, read_config
+from .scheduler import AdaptiveScheduler
+from . import reconcile
+from . import tracing
+from .endpoints import EndpointPool, RoutedClient
 
 # 配置日志
 logger = logging.getLogger('aliyun_ddns')
 
 # 全局缓存用于存储IP地址，避免频繁请求
 _ip_cache = {}
-_cache_timeout = 60  # 缓存60秒
+# 缓存10秒，避免手动与自动同步在短时间内重复请求；
+# min_interval 小于该值时，相邻两轮同步可能复用同一个缓存结果
+_cache_timeout = 10
+
+# 上一轮同步检测到的IP，用于判断IP是否变化
+_last_ips = {}
+
+# API 端点池，跨同步周期保留测速统计
+_endpoint_pools = {}
+_endpoint_pools_lock = threading.Lock()
 
 def log_message(message, level=logging.INFO):
     """通用日志记录函数"""
     logger.log(level, message)
 
-@retry(max_attempts=3, delay=1, backoff=2)
 def valid_ip(ip, ipv6=False):
     """验证IP地址格式"""
     try:
-        if ipv6:
-            # 简化的 IPv6 验证，检查是否包含有效的十六进制字符和冒号
-            # 这是一个实用的验证，而不是严格的 RFC 验证
-            if not ip or not isinstance(ip, str):
-                return False
-            # 检查是否只包含有效的 IPv6 字符
-            import re
-            # 检查是否是有效的 IPv6 格式（简化版）
-            if re.match(r'^[0-9a-fA-F:]+$', ip) and ':' in ip:
-                # 检查是否有多个冒号
-                if '::' in ip:
-                    # 压缩格式，最多只能有一个 ::
-                    if ip.count('::') > 1:
-                        return False
-                return True
-            return False
-        # IPv4 验证
-        parts = ip.split('.')
-        if len(parts) != 4:
-            return False
-        for part in parts:
-            if not part.isdigit() or not 0 <= int(part) <= 255:
-                return False
-        return True
-    except Exception:
+        return ipaddress.ip_address(ip).version == (6 if ipv6 else 4)
+    except (TypeError, ValueError):
         return False
 
 @retry(max_attempts=3, delay=1, backoff=2)
@@ -100,10 +91,12 @@ def get_public_ip(ipv6=False, services=None):
     def fetch_ip(url):
         try:
             logger.debug(f"尝试从 {url} 获取IP地址")
-            r = requests.get(url, timeout=10)  # 10秒超时
-            r.raise_for_status()
+            with tracing.span('ip.fetch', url=url):
+                r = requests.get(url, timeout=10)  # 10秒超时
+                r.raise_for_status()
             ip = r.text.strip()
             if ip and valid_ip(ip, ipv6):
+                ip = normalize_ip(ip)
                 logger.debug(f"从 {url} 成功获取IP地址: {ip}")
                 return ip
             else:
@@ -115,7 +108,7 @@ def get_public_ip(ipv6=False, services=None):
 
     # 使用线程池并发获取IP，提高效率
     with ThreadPoolExecutor(max_workers=min(5, len(services))) as executor:
-        future_to_url = {executor.submit(fetch_ip, url): url for url in services}
+        future_to_url = {tracing.submit(executor, 'ip.fetch', fetch_ip, url): url for url in services}
         for future in as_completed(future_to_url):
             url = future_to_url[future]
             try:
@@ -133,39 +126,14 @@ def get_public_ip(ipv6=False, services=None):
     return None
 
 def validate_config(config):
-    """验证配置"""
-    errors = []
-    required = ['access_key_id', 'access_key_secret', 'domain', 'records']
-    for field in required:
-        if field not in config:
-            errors.append(f"缺少配置项: {field}")
-    
-    if 'records' in config:
-        for i, r in enumerate(config['records']):
-            if 'rr' not in r:
-                errors.append(f"记录{i+1}缺少rr字段")
-            if 'type' not in r or r['type'] not in ['A', 'AAAA']:
-                errors.append(f"记录{i+1}类型错误，必须是A或AAAA")
-    
-    if errors:
-        raise ValueError("配置错误: " + ", ".join(errors))
+    """验证原始配置字典，规则与 load_config 一致，出错时抛出 ConfigError"""
+    compile_config(config)
     return True
 
-def load_config(path='config.yaml'):
-    """加载配置"""
+def load_config(path='config.yaml', use_cache=True):
+    """加载配置，返回编译后的不可变 Config 对象"""
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f) or {}
-        
-        # 设置默认值
-        config.setdefault('interval', 300)
-        config.setdefault('ttl', 600)
-        
-        # 为每个记录设置默认 TTL
-        for record in config.get('records', []):
-            record.setdefault('ttl', config['ttl'])
-        
-        validate_config(config)
+        config = read_config(path, use_cache=use_cache)
         log_message("配置加载成功")
         return config
     except Exception as e:
@@ -198,7 +166,35 @@ def get_dns_record(client, domain, rr, record_type):
         raise
 
 @retry(max_attempts=3, delay=1, backoff=2)
-def update_dns_record(client, record, ip, config):
+def get_zone_records(client, domain, page_size=500):
+    """获取域名下的全部 A/AAAA 解析记录（分页）"""
+    records = []
+    page = 1
+    try:
+        while True:
+            req = DescribeDomainRecordsRequest.DescribeDomainRecordsRequest()
+            req.set_DomainName(domain)
+            req.set_PageNumber(page)
+            req.set_PageSize(page_size)
+            with tracing.span('zone.read', domain=domain, page=page):
+                resp = yaml.safe_load(client.do_action_with_exception(req))
+            batch = resp.get('DomainRecords', {}).get('Record', [])
+            records.extend(r for r in batch if r.get('Type') in ('A', 'AAAA'))
+            if not batch or page * page_size >= int(resp.get('TotalCount', 0)):
+                return records
+            page += 1
+    except ServerException as e:
+        logger.error(f"查询记录列表失败 (服务器错误): {e.get_error_code()} - {e.get_error_msg()}")
+        raise
+    except ClientException as e:
+        logger.error(f"查询记录列表失败 (客户端错误): {e.get_error_code()} - {e.get_error_msg()}")
+        raise
+    except Exception as e:
+        logger.error(f"查询记录列表失败 (未知错误): {e}")
+        raise
+
+@retry(max_attempts=3, delay=1, backoff=2)
+def update_dns_record(client, record, ip, ttl=600):
     """更新DNS记录"""
     try:
         req = UpdateDomainRecordRequest.UpdateDomainRecordRequest()
@@ -206,7 +202,7 @@ def update_dns_record(client, record, ip, config):
         req.set_RR(record['RR'])
         req.set_Type(record['Type'])
         req.set_Value(ip)
-        req.set_TTL(config.get('ttl', 600))
+        req.set_TTL(ttl)
         resp = client.do_action_with_exception(req)
         logger.debug(f"更新记录响应: {resp}")
         logger.info(f"已更新记录: {record['RR']} -> {ip}")
@@ -222,7 +218,7 @@ def update_dns_record(client, record, ip, config):
         raise
 
 @retry(max_attempts=3, delay=1, backoff=2)
-def create_dns_record(client, domain, rr, record_type, ip, config):
+def create_dns_record(client, domain, rr, record_type, ip, ttl=600):
     """创建DNS记录"""
     try:
         req = AddDomainRecordRequest.AddDomainRecordRequest()
@@ -230,7 +226,7 @@ def create_dns_record(client, domain, rr, record_type, ip, config):
         req.set_RR(rr)
         req.set_Type(record_type)
         req.set_Value(ip)
-        req.set_TTL(config.get('ttl', 600))
+        req.set_TTL(ttl)
         resp = client.do_action_with_exception(req)
         logger.debug(f"创建记录响应: {resp}")
         logger.info(f"已创建记录: {rr}.{domain} -> {ip}")
@@ -248,81 +244,199 @@ def create_dns_record(client, domain, rr, record_type, ip, config):
         logger.error(f"创建记录失败 (未知错误): {e}")
         raise
 
+class SyncResult:
+    """同步结果，可直接作为布尔值使用"""
+    __slots__ = ('ok', 'changed', 'ips')
+
+    def __init__(self, ok, changed=False, ips=None):
+        self.ok = ok
+        self.changed = changed
+        self.ips = ips or {}
+
+    def __bool__(self):
+        return self.ok
+
+def get_endpoint_pool(account):
+    """获取（或创建）与端点配置对应的端点池"""
+    key = (account.endpoints, account.probe_interval)
+    with _endpoint_pools_lock:
+        if key not in _endpoint_pools:
+            _endpoint_pools[key] = EndpointPool(account.endpoints, account.probe_interval)
+        return _endpoint_pools[key]
+
+def create_client(config):
+    """根据配置创建 API 客户端，配置了多个端点时按延迟选择并自动切换"""
+    account = config.account
+    client = AcsClient(
+        account.access_key_id,
+        account.access_key_secret,
+        account.region
+    )
+    if not account.endpoints:
+        return client
+    return RoutedClient(client, get_endpoint_pool(account))
+
+def detect_ips(config):
+    """每个地址族只获取一次公网IP"""
+    ips = {}
+    for family in config.domain.by_family:
+        logger.info(f"正在获取IPv{family}地址...")
+        with tracing.span('ip.discover', family=family):
+            ips[family] = get_public_ip(family == 6)
+        if not ips[family]:
+            logger.error(f"获取IPv{family}地址失败")
+    return ips
+
+def plan_records(client, config, ips):
+    """读取解析记录并计算最小变更集"""
+    observed = get_zone_records(client, config.domain.name)
+    return reconcile.plan(config.domain.records, ips, observed)
+
+def apply_operation(client, config, op):
+    """执行单个调和操作"""
+    record = op.record
+    if op.action == reconcile.NOOP:
+        logger.info(f"[{record.name}] 记录未变化: {op.value}")
+        return True
+    if op.action == reconcile.SKIP:
+        logger.error(f"[{record.name}] 跳过: {op.reason}")
+        return False
+    if op.action == reconcile.UPDATE:
+        with tracing.span('write', record=record.name, action=op.action):
+            ok = update_dns_record(client, op.existing, op.value, record.ttl)
+        if ok:
+            logger.info(f"[{record.name}] 记录已更新: {op.describe()}")
+            return True
+        return False
+    with tracing.span('write', record=record.name, action=op.action):
+        ok = create_dns_record(client, config.domain.name, record.rr, record.type, op.value, record.ttl)
+    if ok:
+        logger.info(f"[{record.name}] 记录已创建: {op.value}")
+        return True
+    return False
+
+def apply_operations(client, config, operations):
+    """执行变更集，写操作并发进行，返回成功的记录数"""
+    success_count = 0
+    writes = []
+    for op in operations:
+        if op.is_write:
+            writes.append(op)
+        elif apply_operation(client, config, op):
+            success_count += 1
+    if not writes:
+        return success_count
+
+    # 使用线程池并发执行写操作，提高效率
+    with ThreadPoolExecutor(max_workers=min(10, len(writes))) as executor:
+        future_to_op = {
+            tracing.submit(executor, 'write', apply_operation, client, config, op): op
+            for op in writes
+        }
+        for future in as_completed(future_to_op):
+            op = future_to_op[future]
+            try:
+                if future.result(timeout=30):  # 30秒超时
+                    success_count += 1
+            except Exception as e:
+                logger.error(f"[{op.record.name}] 同步记录失败: {e}")
+    return success_count
+
 def sync_records(config):
-    """同步所有记录（带详细日志）"""
+    """同步所有记录（带详细日志），返回 SyncResult"""
+    with tracing.span('sync', domain=config.domain.name):
+        return _sync_records(config)
+
+def _sync_records(config):
     start_time = time.time()
     try:
-        client = AcsClient(
-            config['access_key_id'],
-            config['access_key_secret'],
-            config.get('region', 'cn-hangzhou')
-        )
-        success_count = 0
-        total_records = len(config['records'])
+        client = create_client(config)
+        total_records = len(config.domain.records)
         logger.info(f"开始同步 {total_records} 条记录")
-        
-        # 使用线程池并发处理所有记录，提高效率
-        with ThreadPoolExecutor(max_workers=min(10, total_records)) as executor:
-            # 提交所有记录同步任务
-            future_to_record = {
-                executor.submit(sync_single_record, client, config, record): record 
-                for record in config['records']
-            }
-            
-            # 处理完成的任务
-            for future in as_completed(future_to_record):
-                record = future_to_record[future]
-                try:
-                    result = future.result(timeout=30)  # 30秒超时
-                    if result:
-                        success_count += 1
-                except Exception as e:
-                    record_name = f"{record['rr']}.{config['domain']}"
-                    record_type = record['type']
-                    logger.error(f"[{record_name}] 同步记录失败: {e}")
+
+        ips = detect_ips(config)
+
+        # 与上一轮检测到的IP比较，首次运行不视为变化
+        changed = any(ip and _last_ips.get(family) not in (None, ip)
+                      for family, ip in ips.items())
+        _last_ips.update({family: ip for family, ip in ips.items() if ip})
+
+        with tracing.span('plan'):
+            operations = plan_records(client, config, ips)
+        counts = reconcile.summarize(operations)
+        logger.info(f"变更计划: 新增 {counts[reconcile.ADD]}, 更新 {counts[reconcile.UPDATE]}, "
+                    f"不变 {counts[reconcile.NOOP]}, 跳过 {counts[reconcile.SKIP]}")
+        with tracing.span('apply'):
+            success_count = apply_operations(client, config, operations)
+        changed = changed or any(op.changes_value for op in operations)
         
         duration = time.time() - start_time
         logger.info(f"同步完成: {success_count}/{total_records} 成功 ({duration:.1f}s)")
-        return success_count > 0
+        return SyncResult(success_count > 0, changed, ips)
     except Exception as e:
         logger.error(f"同步失败: {e}")
-        return False
+        return SyncResult(False)
 
-def sync_single_record(client, config, record):
-    """同步单个记录"""
-    record_name = f"{record['rr']}.{config['domain']}"
-    record_type = record['type']
-    
+def show_plan(config):
+    """打印变更计划，不调用任何写接口"""
+    client = create_client(config)
+    ips = detect_ips(config)
+    operations = plan_records(client, config, ips)
+    for op in operations:
+        print(op.describe())
+    counts = reconcile.summarize(operations)
+    print(f"新增 {counts[reconcile.ADD]}, 更新 {counts[reconcile.UPDATE]}, "
+          f"不变 {counts[reconcile.NOOP]}, 跳过 {counts[reconcile.SKIP]}")
+    return counts[reconcile.SKIP] == 0
+
+def run_loop(config, scheduler=None):
+    """按自适应间隔持续同步"""
+    scheduler = scheduler or AdaptiveScheduler.from_config(config)
     try:
-        # 获取当前IP
-        logger.info(f"[{record_name}] 正在获取{record_type}地址...")
-        ip = get_public_ip(record_type == 'AAAA')
-        if not ip:
-            logger.error(f"[{record_name}] 获取IP失败")
-            return False
-        
-        # 查询现有记录
-        existing = get_dns_record(client, config['domain'], record['rr'], record_type)
-        if existing:
-            if existing['Value'] == ip:
-                logger.info(f"[{record_name}] IP未变化: {ip}")
-                return True
-            else:
-                old_ip = existing['Value']
-                if update_dns_record(client, existing, ip, config):
-                    logger.info(f"[{record_name}] IP已更新: {old_ip} → {ip}")
-                    return True
-                else:
-                    return False
-        else:
-            if create_dns_record(client, config['domain'], record['rr'], record_type, ip, config):
-                logger.info(f"[{record_name}] 记录已创建: {ip}")
-                return True
-            else:
-                return False
-    except Exception as e:
-        logger.error(f"[{record_name}] 处理记录时发生异常: {e}")
-        return False
+        while True:
+            result = sync_records(config)
+            scheduler.record(result.ok, result.changed)
+            logger.info(f"下次同步: {scheduler.status()}")
+            scheduler.sleep()
+    except KeyboardInterrupt:
+        logger.info("已停止")
+        return 0
+
+def profile_cycle(config, output='logs/profile.txt', limit=40):
+    """在 cProfile 下执行一轮同步，并写入按耗时排序的统计"""
+    import cProfile
+    import pstats
+    import os
+
+    # cProfile 只统计当前线程，线程池任务在各自线程内单独分析后合并
+    profiler = cProfile.Profile()
+    tracing.start_profiling()
+    try:
+        result = profiler.runcall(sync_records, config)
+    finally:
+        worker_profiles = tracing.stop_profiling()
+
+    # 原始数据写入同名 .prof 文件；output 本身以 .prof 结尾时追加后缀，避免与文本报告互相覆盖
+    dump_path = os.path.splitext(output)[0] + '.prof'
+    if os.path.abspath(dump_path) == os.path.abspath(output):
+        dump_path = output + '.prof'
+
+    directory = os.path.dirname(output)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(output, 'w', encoding='utf-8') as f:
+        stats = pstats.Stats(profiler, stream=f)
+        for worker_profile in worker_profiles:
+            stats.add(worker_profile)
+        stats.dump_stats(dump_path)
+        stats.strip_dirs()
+        f.write(f"== 主线程 + {len(worker_profiles)} 个线程池任务 ==\n")
+        f.write("== 按累计耗时排序 ==\n")
+        stats.sort_stats('cumulative').print_stats(limit)
+        f.write("== 按自身耗时排序 ==\n")
+        stats.sort_stats('tottime').print_stats(limit)
+    logger.info(f"性能分析结果已写入: {output}（原始数据: {dump_path}）")
+    return result
 
 def main():
     """主函数 - 命令行入口"""
@@ -332,22 +446,42 @@ def main():
     parser = argparse.ArgumentParser(description='阿里云 DDNS 客户端')
     parser.add_argument('-c', '--config', default='config.yaml', help='配置文件路径')
     parser.add_argument('-v', '--verbose', action='store_true', help='详细日志')
+    parser.add_argument('--no-cache', action='store_true', help='不使用编译后的配置缓存')
+    parser.add_argument('--loop', action='store_true', help='持续运行，按自适应间隔轮询')
+    parser.add_argument('--plan', action='store_true', help='只显示变更计划，不修改解析记录')
+    parser.add_argument('--trace', nargs='?', const='logs/trace.jsonl', metavar='FILE',
+                        help='将各阶段耗时写入 Chrome trace-event 格式的 JSON-lines 文件')
+    parser.add_argument('--profile', nargs='?', const='logs/profile.txt', metavar='FILE',
+                        help='在 cProfile 下执行一轮同步并写入热点统计')
     
     args = parser.parse_args()
     
     # 配置日志
     setup_logging("logs/core.log", args.verbose)
+    if args.trace:
+        tracing.enable(args.trace)
     
     try:
         # 加载配置
-        config = load_config(args.config)
+        config = load_config(args.config, use_cache=not args.no_cache)
         
+        if args.plan:
+            return 0 if show_plan(config) else 1
+
+        if args.profile:
+            return 0 if profile_cycle(config, args.profile) else 1
+
+        if args.loop:
+            return run_loop(config)
+
         # 执行同步
         success = sync_records(config)
         return 0 if success else 1
     except Exception as e:
         log_message(f"程序执行失败: {e}", logging.ERROR)
         return 1
+    finally:
+        tracing.disable()
 
 if __name__ == '__main__':
     exit(main())
\ No newline at end of file
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云 DDNS API 端点选择模块
+
+对配置的多个云解析 API 端点测速，按延迟和错误率排序，
+请求优先发往最优端点，失败时自动切换到下一个，并定期重新测速。
+"""
+
+import time
+import socket
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from . import tracing
+
+logger = logging.getLogger('aliyun_ddns')
+
+# 延迟与错误率的指数移动平均系数
+_EWMA_ALPHA = 0.3
+# 错误率对评分的放大倍数，错误率 100% 时评分约为延迟的 11 倍
+_ERROR_PENALTY = 10
+
+# 视为端点故障、需要切换端点的 SDK 错误码
+_FAILOVER_CODES = {
+    'SDK.HttpError',
+    'SDK.ServerUnreachable',
+    'SDK.EndpointResolvingError',
+    'ServiceUnavailable',
+    'InternalError',
+    'Throttling.System',
+}
+
+
+def parse_endpoint(spec):
+    """解析端点配置（host、host:port 或 http(s)://host:port），返回 (protocol, host, port)"""
+    parts = urlsplit(spec if '://' in spec else f"https://{spec}")
+    protocol = parts.scheme.lower()
+    if protocol not in ('http', 'https'):
+        raise ValueError(f"不支持的协议: {parts.scheme}")
+    if not parts.hostname:
+        raise ValueError("缺少主机名")
+    try:
+        port = parts.port
+    except ValueError:
+        raise ValueError("端口无效") from None
+    return protocol, parts.hostname, port or (80 if protocol == 'http' else 443)
+
+
+class Endpoint:
+    """单个 API 端点及其测量统计"""
+    __slots__ = ('spec', 'host', 'port', 'protocol', 'latency', 'error_rate')
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.protocol, self.host, self.port = parse_endpoint(spec)
+        self.latency = None
+        self.error_rate = 0.0
+
+    @property
+    def address(self):
+        """SDK 请求使用的端点地址（host[:port]）"""
+        default = 80 if self.protocol == 'http' else 443
+        return self.host if self.port == default else f"{self.host}:{self.port}"
+
+    @property
+    def score(self):
+        """评分越低越好，未测量过或测速失败的端点排在可用端点之后"""
+        latency = self.latency if self.latency is not None else float('inf')
+        return latency * (1 + _ERROR_PENALTY * self.error_rate)
+
+    def _observe_error(self, ok):
+        self.error_rate = _EWMA_ALPHA * (0.0 if ok else 1.0) + (1 - _EWMA_ALPHA) * self.error_rate
+
+    def observe_probe(self, latency):
+        """记录一次测速结果，latency 为 None 表示测速失败，端点在下次测速成功前视为不可达"""
+        # 只有测速结果更新延迟，实际调用耗时包含服务端处理时间，不具可比性
+        if latency is None:
+            self.latency = None
+        else:
+            self.latency = latency if self.latency is None else (
+                _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * self.latency)
+        self._observe_error(latency is not None)
+
+    def observe_call(self, ok):
+        """记录一次实际调用的结果（只影响错误率）"""
+        self._observe_error(ok)
+
+    def __repr__(self):
+        latency = f"{self.latency * 1000:.0f}ms" if self.latency is not None else "-"
+        return f"Endpoint({self.spec}, {latency}, err={self.error_rate:.0%})"
+
+
+def tcp_probe(endpoint, timeout=3):
+    """通过 TCP 连接耗时测量端点延迟，失败时抛出 OSError"""
+    start = time.perf_counter()
+    with socket.create_connection((endpoint.host, endpoint.port), timeout=timeout):
+        return time.perf_counter() - start
+
+
+def is_failover_error(exc):
+    """判断异常是否由端点本身故障引起（网络错误、5xx 等）"""
+    if isinstance(exc, OSError):
+        return True
+    get_status = getattr(exc, 'get_http_status', None)
+    if get_status:
+        status = get_status()
+        if status and int(status) >= 500:
+            return True
+    get_code = getattr(exc, 'get_error_code', None)
+    return bool(get_code) and get_code() in _FAILOVER_CODES
+
+
+class EndpointPool:
+    """按延迟与错误率排序的端点池"""
+
+    def __init__(self, specs, probe_interval=600, probe=tcp_probe, clock=time.monotonic):
+        if not specs:
+            raise ValueError("端点列表不能为空")
+        self.endpoints = [Endpoint(spec) for spec in specs]
+        self.probe_interval = probe_interval
+        self._probe = probe
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._last_probe = None
+        self._best = None
+
+    def probe_all(self):
+        """并发测速全部端点"""
+        def run(endpoint):
+            with tracing.span('endpoint.probe', endpoint=endpoint.spec):
+                try:
+                    return endpoint, self._probe(endpoint)
+                except Exception as e:
+                    logger.debug(f"端点测速失败 {endpoint.spec}: {e}")
+                    return endpoint, None
+
+        with ThreadPoolExecutor(max_workers=min(8, len(self.endpoints))) as executor:
+            futures = [tracing.submit(executor, 'endpoint.probe', run, e) for e in self.endpoints]
+            results = [future.result() for future in futures]
+        with self._lock:
+            for endpoint, latency in results:
+                endpoint.observe_probe(latency)
+            self._last_probe = self._clock()
+        logger.debug(f"端点测速结果: {self.ranked(reprobe=False)}")
+
+    def _maybe_probe(self):
+        with self._probe_lock:
+            if self._last_probe is None or self._clock() - self._last_probe >= self.probe_interval:
+                self.probe_all()
+
+    def ranked(self, reprobe=True):
+        """按评分排序的端点列表，必要时先重新测速"""
+        if reprobe:
+            self._maybe_probe()
+        with self._lock:
+            ranked = sorted(self.endpoints, key=lambda e: e.score)
+            best = ranked[0]
+            if best is not self._best:
+                if self._best is not None:
+                    logger.info(f"切换 API 端点: {self._best.spec} → {best.spec}")
+                self._best = best
+            return ranked
+
+    def best(self):
+        return self.ranked()[0]
+
+    def report(self, endpoint, ok):
+        """记录一次实际调用的结果，端点故障时在下次选择前重新测速"""
+        with self._lock:
+            endpoint.observe_call(ok)
+            if not ok:
+                self._last_probe = None
+
+
+class RoutedClient:
+    """将请求路由到最优端点、失败时自动切换的客户端包装
+
+    接口与 AcsClient.do_action_with_exception 一致，可直接替换。
+    """
+
+    def __init__(self, client, pool):
+        self.client = client
+        self.pool = pool
+
+    def do_action_with_exception(self, request):
+        last_error = None
+        for endpoint in self.pool.ranked():
+            request.set_endpoint(endpoint.address)
+            request.set_protocol_type(endpoint.protocol)
+            try:
+                with tracing.span('api', endpoint=endpoint.spec, action=request.get_action_name()):
+                    response = self.client.do_action_with_exception(request)
+            except Exception as e:
+                failover = is_failover_error(e)
+                self.pool.report(endpoint, not failover)
+                if not failover:
+                    raise
+                logger.warning(f"API 端点 {endpoint.spec} 请求失败，尝试下一个端点: {e}")
+                last_error = e
+                continue
+            self.pool.report(endpoint, True)
+            return response
+        raise last_error
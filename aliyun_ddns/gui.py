@@ -18,6 +18,8 @@ from tkinter import Tk, messagebox
 
 # 导入核心模块和工具函数
 from . import core
+from . import reconcile
+from .scheduler import AdaptiveScheduler
 from .utils import setup_logging, get_config_path, _config_lock
 
 APP_NAME = "阿里云DDNS"
@@ -29,8 +31,10 @@ class DDNSTrayApp:
         self.running = True
         self.config = None
         self.config_mtime = 0
-        self.last_sync_time = 0  # 上次同步时间
-        self.sync_interval = 30   # 同步间隔检查（秒），增加到30秒以减少频繁检查
+        self.last_config_check = 0  # 上次检查配置的时间
+        self.tick = 5  # 工作线程检查间隔（秒），需小于最小轮询间隔
+        self.scheduler = AdaptiveScheduler()
+        self.status = "未同步"
         
         # 立即加载配置
         self._load_config()
@@ -55,6 +59,11 @@ class DDNSTrayApp:
                 if current_mtime > self.config_mtime:
                     self.config_mtime = current_mtime
                     self.config = core.load_config(CONFIG_FILE)
+                    self.scheduler.configure(
+                        self.config.min_interval,
+                        self.config.max_interval,
+                        self.config.fast_window
+                    )
                     return True
                 return False
             except Exception as e:
@@ -109,23 +118,19 @@ class DDNSTrayApp:
         """后台工作线程"""
         while self.running:
             try:
+                now = time.time()
+
                 # 检查配置更新（每60秒检查一次，减少频繁检查）
-                if int(time.time()) % 60 == 0:
+                if now - self.last_config_check >= 60:
+                    self.last_config_check = now
                     if self._load_config():
                         self.icon.notify("配置已更新", APP_NAME)
                 
-                # 自动同步
-                if self.config:
-                    interval = self.config.get('interval', 300)
-                    current_time = time.time()
-                    
-                    # 检查是否到了同步时间
-                    if current_time - self.last_sync_time >= interval:
-                        self._sync_once()
-                        self.last_sync_time = current_time
+                # 自动同步，间隔由自适应调度器决定
+                if self.config and self.scheduler.due():
+                    self._sync_once()
                 
-                # 减少CPU占用，增加到30秒
-                time.sleep(30)
+                self.scheduler.sleep(max_delay=self.tick)
             except Exception as e:
                 core.log_message(f"工作线程错误: {e}", logging.ERROR)
                 time.sleep(60)  # 出错时等待更长时间
@@ -133,11 +138,17 @@ class DDNSTrayApp:
     def _sync_once(self):
         """执行同步"""
         try:
-            if self.config and core.sync_records(self.config):
-                self.icon.title = f"{APP_NAME} - 已同步"
+            if not self.config:
+                return
+            result = core.sync_records(self.config)
+            self.scheduler.record(result.ok, result.changed)
+            if result:
+                self.status = "已同步"
                 self.icon.icon = self._create_icon("#4CAF50")  # 绿色
             else:
+                self.status = "同步失败"
                 self.icon.icon = self._create_icon("#F44336")  # 红色
+            self.icon.title = f"{APP_NAME} - {self.status} | {self.scheduler.status()}"
         except Exception as e:
             core.log_message(f"同步错误: {e}", logging.ERROR)
 
@@ -153,17 +164,12 @@ class DDNSTrayApp:
                 self._msg("错误", "配置未加载")
                 return
                 
-            from aliyunsdkcore.client import AcsClient
-            client = AcsClient(
-                self.config['access_key_id'],
-                self.config['access_key_secret'],
-                self.config.get('region', 'cn-hangzhou')
-            )
+            client = core.create_client(self.config)
+            zone = reconcile.index_zone(core.get_zone_records(client, self.config.domain.name))
             msg = []
-            for r in self.config['records']:
-                rec = core.get_dns_record(client, self.config['domain'], r['rr'], r['type'])
-                if rec:
-                    msg.append(f"{rec['RR']}.{self.config['domain']}: {rec['Value']}")
+            for r in self.config.domain.records:
+                for rec in zone.get((r.rr, r.type), []):
+                    msg.append(f"{r.name}: {rec['Value']}")
             self._msg("DNS记录", "\n".join(msg) or "无记录")
         except Exception as e:
             core.log_message(f"获取记录失败: {e}", logging.ERROR)
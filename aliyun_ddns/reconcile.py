@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云 DDNS 声明式调和模块
+
+根据期望状态（配置 + 检测到的IP）和实际状态（解析记录列表）
+一次性计算出最小变更集，不涉及任何 API 调用。
+"""
+
+from .utils import normalize_ip
+from . import tracing
+
+ADD = 'add'
+UPDATE = 'update'
+NOOP = 'noop'
+SKIP = 'skip'
+
+_SYMBOLS = {ADD: '+', UPDATE: '~', NOOP: '=', SKIP: '!'}
+
+
+class Operation:
+    """单条记录的调和操作"""
+    __slots__ = ('action', 'record', 'value', 'existing', 'reason')
+
+    def __init__(self, action, record, value=None, existing=None, reason=''):
+        self.action = action
+        self.record = record
+        self.value = value
+        self.existing = existing
+        self.reason = reason
+
+    @property
+    def is_write(self):
+        return self.action in (ADD, UPDATE)
+
+    @property
+    def changes_value(self):
+        """是否修改记录值（新增或值不同的更新），仅 TTL 不同的更新不算"""
+        if self.action == ADD:
+            return True
+        return self.action == UPDATE and normalize_ip(self.existing.get('Value')) != self.value
+
+    def describe(self):
+        """可读的单行描述"""
+        record = self.record
+        head = f"{_SYMBOLS[self.action]} {self.action:<6} {record.name} {record.type}"
+        if self.action == ADD:
+            return f"{head} {self.value} ttl={record.ttl}"
+        if self.action == UPDATE:
+            old_value, old_ttl = self.existing.get('Value'), self.existing.get('TTL')
+            value = f"{old_value} → {self.value}" if self.changes_value else self.value
+            ttl_same = old_ttl is None or int(old_ttl) == record.ttl
+            ttl = record.ttl if ttl_same else f"{old_ttl} → {record.ttl}"
+            return f"{head} {value} ttl={ttl}"
+        if self.action == NOOP:
+            return f"{head} {self.value} ttl={record.ttl}"
+        return f"{head} ({self.reason})"
+
+    def __repr__(self):
+        return f"Operation({self.describe()!r})"
+
+
+def index_zone(observed):
+    """按 (RR, Type) 索引解析记录，同名同类型的多条记录保留为列表"""
+    index = {}
+    for r in observed:
+        key = (str(r.get('RR', '')).lower(), r.get('Type'))
+        index.setdefault(key, []).append(r)
+    return index
+
+
+def plan(records, ips, observed):
+    """计算最小变更集
+
+    records: 配置中的 Record 序列
+    ips: 地址族(4/6) -> 检测到的IP
+    observed: DescribeDomainRecords 返回的记录字典列表
+    """
+    index = index_zone(observed)
+    operations = []
+    for record in records:
+        with tracing.span('decide', record=record.name):
+            operations.append(_decide(record, ips.get(record.family), index))
+    return operations
+
+
+def _decide(record, ip, index):
+    if not ip:
+        return Operation(SKIP, record, reason="获取IP失败")
+    ip = normalize_ip(ip)
+    candidates = index.get((record.rr, record.type))
+    if not candidates:
+        return Operation(ADD, record, ip)
+    # 同名记录有多条时，优先选择值已经一致的那条，避免无谓更新
+    existing = next((c for c in candidates if normalize_ip(c.get('Value')) == ip),
+                    candidates[0])
+    ttl = existing.get('TTL')
+    in_sync = normalize_ip(existing.get('Value')) == ip and (ttl is None or int(ttl) == record.ttl)
+    return Operation(NOOP if in_sync else UPDATE, record, ip, existing)
+
+
+def summarize(operations):
+    """按操作类型统计数量"""
+    counts = {ADD: 0, UPDATE: 0, NOOP: 0, SKIP: 0}
+    for op in operations:
+        counts[op.action] += 1
+    return counts
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云 DDNS 自适应轮询调度模块
+"""
+
+import time
+import threading
+import logging
+
+logger = logging.getLogger('aliyun_ddns')
+
+
+class AdaptiveScheduler:
+    """根据 IP 稳定性自适应调整轮询间隔
+
+    检测到 IP 变化、开始同步失败、失败后恢复或系统唤醒后，在 fast_window 秒内按 min_interval
+    快速轮询；之后无论 IP 保持稳定还是持续失败，间隔都按 factor 指数增长，直到 max_interval。
+    """
+
+    def __init__(self, min_interval=15, max_interval=300, fast_window=300, factor=2.0,
+                 clock=time.monotonic):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.fast_window = fast_window
+        self.factor = factor
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.interval = min_interval
+        self.last_run = None
+        # 启动时网络状态未知，先快速轮询一段时间
+        self.fast_until = clock() + fast_window
+        self._last_ok = True
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """根据编译后的配置创建调度器"""
+        return cls(config.min_interval, config.max_interval, config.fast_window, **kwargs)
+
+    def configure(self, min_interval, max_interval, fast_window):
+        """更新上下限（配置重新加载时调用），当前间隔限制在新范围内"""
+        with self._lock:
+            self.min_interval = min_interval
+            self.max_interval = max(min_interval, max_interval)
+            self.fast_window = fast_window
+            self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+
+    def _speed_up(self, now, reason):
+        self.interval = self.min_interval
+        self.fast_until = now + self.fast_window
+        logger.info(f"{reason}，切换为快速轮询 {self.interval}s")
+
+    def _back_off(self, now):
+        if now >= self.fast_until:
+            self.interval = min(self.interval * self.factor, self.max_interval)
+
+    def trigger(self, reason):
+        """外部事件（如系统唤醒）触发快速轮询"""
+        with self._lock:
+            self._speed_up(self._clock(), reason)
+
+    def record(self, ok, changed=False):
+        """记录一次同步结果并计算下一次的轮询间隔"""
+        with self._lock:
+            now = self._clock()
+            self.last_run = now
+            if not ok and self._last_ok:
+                # 只有首次失败开启快速轮询，持续失败时与稳定状态一样逐步退避
+                self._speed_up(now, "同步失败")
+            elif not ok:
+                self._back_off(now)
+            elif changed:
+                self._speed_up(now, "检测到IP变化")
+            elif not self._last_ok:
+                self._speed_up(now, "同步已恢复")
+            else:
+                self._back_off(now)
+            self._last_ok = ok
+            return self.interval
+
+    def seconds_until_due(self):
+        """距离下一次同步的秒数，0 表示已到期"""
+        with self._lock:
+            if self.last_run is None:
+                return 0
+            return max(0.0, self.last_run + self.interval - self._clock())
+
+    def due(self):
+        """是否已到同步时间"""
+        return self.seconds_until_due() <= 0
+
+    def sleep(self, max_delay=None, wake_gap=30):
+        """休眠到下一次同步时间（最多 max_delay 秒，至少 1 秒）
+
+        实际经过的墙钟时间比预期多出 wake_gap 秒以上时，说明系统曾挂起，
+        唤醒后网络可能已变化，触发快速轮询。
+        """
+        delay = self.seconds_until_due()
+        if max_delay is not None:
+            delay = min(delay, max_delay)
+        delay = max(1, delay)
+        # 单调时钟在部分系统上挂起期间不计时，这里用墙钟检测挂起
+        slept_at = time.time()
+        time.sleep(delay)
+        if time.time() - slept_at > delay + wake_gap:
+            self.trigger("系统已唤醒")
+
+    def status(self):
+        """状态描述，包含当前间隔和上下限"""
+        with self._lock:
+            return f"轮询 {self.interval:.0f}s ({self.min_interval}-{self.max_interval}s)"
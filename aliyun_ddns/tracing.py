@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云 DDNS 追踪模块
+
+轻量级的 span 计时，每个 span 以 Chrome trace-event（"ph": "X"）格式
+逐行写入 JSON-lines 文件。未启用时 span() 返回空上下文，几乎没有开销。
+
+转换为 chrome://tracing / Perfetto 可直接打开的 JSON 数组：
+    python -m aliyun_ddns.tracing logs/trace.jsonl > trace.json
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import logging
+from contextlib import nullcontext
+
+logger = logging.getLogger('aliyun_ddns')
+
+_NULL_SPAN = nullcontext()
+
+# 性能分析期间收集的工作线程 cProfile 结果，None 表示未在分析
+_profiles = None
+_profiles_lock = threading.Lock()
+
+
+class Tracer:
+    """span 收集器，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self.path = None
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def open(self, path):
+        """开始写入追踪文件（追加模式）"""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = open(path, 'a', encoding='utf-8')
+            self.path = path
+        logger.info(f"追踪已启用: {path}")
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = None
+            self.path = None
+
+    def emit(self, name, start_us, dur_us, cat='ddns', args=None):
+        """写入一个完整事件"""
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': start_us,
+            'dur': dur_us,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file:
+                self._file.write(line + '\n')
+                self._file.flush()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start_us', 'start')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start_us = time.time_ns() // 1000
+        self.start = time.perf_counter()
+        return self.args
+
+    def __exit__(self, exc_type, exc, tb):
+        dur_us = int((time.perf_counter() - self.start) * 1e6)
+        if exc_type is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        self.tracer.emit(self.name, self.start_us, dur_us, self.cat, self.args)
+        return False
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def enable(path):
+    """启用全局追踪"""
+    _tracer.open(path)
+
+
+def disable():
+    """关闭全局追踪"""
+    _tracer.close()
+
+
+def span(name, cat='ddns', **args):
+    """创建一个 span 上下文，进入时返回可追加字段的 args 字典（未启用时为 None）"""
+    if not _tracer.enabled:
+        return _NULL_SPAN
+    return _Span(_tracer, name, cat, args)
+
+
+def start_profiling():
+    """开始收集通过 submit() 提交的工作线程任务的 cProfile 数据"""
+    global _profiles
+    with _profiles_lock:
+        _profiles = []
+
+
+def stop_profiling():
+    """停止收集，返回各工作线程任务的 cProfile.Profile 列表"""
+    global _profiles
+    with _profiles_lock:
+        profiles, _profiles = _profiles or [], None
+    return profiles
+
+
+def _profiled(fn):
+    def run(*args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ 的 cProfile 基于 sys.monitoring，主线程的分析器已覆盖所有线程
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with _profiles_lock:
+                if _profiles is not None:
+                    _profiles.append(profiler)
+    return run
+
+
+def submit(executor, name, fn, *args, **kwargs):
+    """向线程池提交任务，同时记录任务在队列中的等待时间；性能分析期间在工作线程内启用 cProfile"""
+    if _profiles is not None:
+        fn = _profiled(fn)
+    if not _tracer.enabled:
+        return executor.submit(fn, *args, **kwargs)
+    queued_us = time.time_ns() // 1000
+    queued = time.perf_counter()
+
+    def run():
+        waited_us = int((time.perf_counter() - queued) * 1e6)
+        _tracer.emit(f"queue:{name}", queued_us, waited_us, 'queue')
+        return fn(*args, **kwargs)
+
+    return executor.submit(run)
+
+
+def to_chrome(lines):
+    """将 JSON-lines 追踪事件转换为 Chrome trace-event 数组"""
+    return {'traceEvents': [json.loads(line) for line in lines if line.strip()]}
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        json.dump(to_chrome(f), sys.stdout, ensure_ascii=False)
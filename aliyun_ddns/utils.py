@@ -4,12 +4,15 @@
 阿里云 DDNS 工具函数模块
 """
 
+import ipaddress
 import logging
 import os
 import threading
 import time
 from functools import wraps
 
+from . import tracing
+
 # 线程锁用于确保线程安全
 _config_lock = threading.Lock()
 
@@ -61,6 +64,13 @@ def get_config_path():
     """获取配置文件路径"""
     return "config.yaml"
 
+def normalize_ip(ip):
+    """规范化IP地址，等价的写法（如 IPv6 压缩/大小写）返回相同字符串"""
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except (AttributeError, ValueError):
+        return ip
+
 def thread_safe_singleton(cls):
     """线程安全的单例装饰器"""
     instances = {}
@@ -91,7 +101,9 @@ def retry(max_attempts=3, delay=1, backoff=2):
                     attempts += 1
                     if attempts >= max_attempts:
                         raise e
-                    time.sleep(current_delay)
+                    with tracing.span('retry.sleep', func=func.__name__,
+                                      attempt=attempts, delay=current_delay):
+                        time.sleep(current_delay)
                     current_delay *= backoff
             return None
         return wrapper
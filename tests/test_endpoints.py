@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 端点选择与故障切换测试（使用本地监听端口作为替身端点）
+"""
+
+import socket
+
+import pytest
+
+from aliyun_ddns.endpoints import EndpointPool, RoutedClient, tcp_probe
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRequest:
+    def __init__(self):
+        self.endpoints = []
+
+    def set_endpoint(self, endpoint):
+        self.endpoints.append(endpoint)
+
+    def set_protocol_type(self, protocol):
+        self.protocol = protocol
+
+    def get_action_name(self):
+        return 'DescribeDomainRecords'
+
+
+class FakeError(Exception):
+    """模拟 aliyunsdkcore 的 ClientException / ServerException"""
+
+    def __init__(self, code, status=None):
+        super().__init__(code)
+        self.code = code
+        self.status = status
+
+    def get_error_code(self):
+        return self.code
+
+    def get_http_status(self):
+        return self.status
+
+
+class FakeClient:
+    """按端点地址返回预设结果的客户端"""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.calls = []
+
+    def do_action_with_exception(self, request):
+        endpoint = request.endpoints[-1]
+        self.calls.append(endpoint)
+        if endpoint in self.errors:
+            raise self.errors[endpoint]
+        return f"ok from {endpoint}".encode()
+
+
+@pytest.fixture
+def listeners():
+    """创建本地监听端口，返回端口列表"""
+    sockets = []
+
+    def make(count):
+        for _ in range(count):
+            s = socket.socket()
+            s.bind(('127.0.0.1', 0))
+            s.listen(16)
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets[-count:]]
+
+    yield make
+    for s in sockets:
+        s.close()
+
+
+def closed_port():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def delayed_probe(extra):
+    """真实 TCP 测速，再按端口叠加固定延迟，以便控制排序"""
+    def probe(endpoint):
+        return tcp_probe(endpoint, timeout=1) + extra.get(endpoint.port, 0)
+    return probe
+
+
+def test_ranked_by_latency(listeners):
+    slow, fast = listeners(2)
+    pool = EndpointPool([f"http://127.0.0.1:{slow}", f"http://127.0.0.1:{fast}"],
+                        probe=delayed_probe({slow: 0.2}))
+    assert [e.port for e in pool.ranked()] == [fast, slow]
+
+
+def test_unreachable_endpoint_ranks_last(listeners):
+    dead = closed_port()
+    (alive,) = listeners(1)
+    pool = EndpointPool([f"http://127.0.0.1:{dead}", f"http://127.0.0.1:{alive}"],
+                        probe=delayed_probe({alive: 0.5}))
+    ranked = pool.ranked()
+    assert [e.port for e in ranked] == [alive, dead]
+    assert ranked[1].latency is None
+
+
+def test_failed_probe_demotes_fast_endpoint(listeners):
+    fast, slow = listeners(2)
+    clock = FakeClock()
+    down = set()
+
+    def probe(endpoint):
+        if endpoint.port in down:
+            raise OSError("connection refused")
+        return delayed_probe({slow: 0.15})(endpoint)
+
+    pool = EndpointPool([f"http://127.0.0.1:{fast}", f"http://127.0.0.1:{slow}"],
+                        probe_interval=600, probe=probe, clock=clock)
+    assert pool.best().port == fast
+
+    down.add(fast)
+    clock.now += 600
+    assert pool.best().port == slow
+
+    down.clear()
+    clock.now += 600
+    assert pool.best().port == fast
+
+
+@pytest.mark.parametrize('error', [
+    FakeError('SDK.HttpError'),
+    FakeError('ServiceUnavailable', status=503),
+    FakeError('Unknown', status=500),
+    ConnectionRefusedError('refused'),
+])
+def test_failover_to_next_endpoint(listeners, error):
+    fast, slow = listeners(2)
+    fast_addr, slow_addr = f"127.0.0.1:{fast}", f"127.0.0.1:{slow}"
+    pool = EndpointPool([f"http://{slow_addr}", f"http://{fast_addr}"],
+                        probe=delayed_probe({slow: 0.15}))
+    client = FakeClient({fast_addr: error})
+
+    response = RoutedClient(client, pool).do_action_with_exception(FakeRequest())
+
+    assert response == f"ok from {slow_addr}".encode()
+    assert client.calls == [fast_addr, slow_addr]
+    # 调用失败后会重新测速，端点本身仍可连接，但错误率已上升
+    assert pool.endpoints[1].error_rate > 0
+
+
+def test_business_error_raised_without_failover(listeners):
+    fast, slow = listeners(2)
+    fast_addr = f"127.0.0.1:{fast}"
+    pool = EndpointPool([f"http://127.0.0.1:{slow}", f"http://{fast_addr}"],
+                        probe=delayed_probe({slow: 0.15}))
+    error = FakeError('DomainRecordDuplicate', status=400)
+    client = FakeClient({fast_addr: error})
+
+    with pytest.raises(FakeError) as excinfo:
+        RoutedClient(client, pool).do_action_with_exception(FakeRequest())
+
+    assert excinfo.value is error
+    assert client.calls == [fast_addr]
+    assert all(e.error_rate == 0 for e in pool.endpoints)
+
+
+def test_all_endpoints_failing_raises_last_error(listeners):
+    a, b = listeners(2)
+    addrs = [f"127.0.0.1:{a}", f"127.0.0.1:{b}"]
+    pool = EndpointPool([f"http://{addr}" for addr in addrs], probe=delayed_probe({}))
+    client = FakeClient({addr: FakeError('SDK.HttpError') for addr in addrs})
+
+    with pytest.raises(FakeError):
+        RoutedClient(client, pool).do_action_with_exception(FakeRequest())
+    assert sorted(client.calls) == sorted(addrs)